@@ -8,16 +8,22 @@ Once a command is sent it then waits a reply and then loops.
 """
 
 import csv
-import shutil
-import subprocess
+import functools
+import queue
+import re
+import selectors
+import stat
+import tempfile
 import time
 import glob
 import os
+from dataclasses import dataclass, replace
+from concurrent.futures import ThreadPoolExecutor, wait
 from threading import Thread
+import numpy as np  # pylint: disable=import-error
 import serial  # pylint: disable=import-error
 from yaspin import yaspin  # pylint: disable=import-error
 from yaspin.spinners import Spinners  # pylint: disable=import-error
-import timeout_decorator  # pylint: disable=import-error
 import questionary  # pylint: disable=import-error
 
 
@@ -29,6 +35,8 @@ END_MARKER = 62
 SPINNER = yaspin(Spinners.weather)
 ARDUINO_MESSAGE_TIMEOUT = 10
 ARDUINO_EXECUTE_TIMEOUT = 100
+# finds the array number and number of motors in the ready message
+READY_MESSAGE_NUMBERS = re.compile(r"-?\d+")
 # adjustable
 # positive integers only
 MAX_TURNS = 20
@@ -37,7 +45,36 @@ MAX_NUMBER_OF_MOTORS = 22
 # USB_PATH = "/dev/ttyU*"
 USB_PATH = "/dev/ttyACM*"
 CSV_PATH = "/home/pi/"
-CURRENT_STATE_FILENAME = "code/current-state.csv"
+# absolute so the background save doesn't depend on the working directory
+CURRENT_STATE_FILENAME = os.path.join(CSV_PATH, "code/current-state.csv")
+# one worker for each array, reused every time we connect to the arrays
+EXECUTOR = ThreadPoolExecutor(max_workers=MAX_NUMBER_OF_ARRAYS)
+# current states waiting to be saved to CURRENT_STATE_FILENAME
+STATE_QUEUE = queue.Queue()
+
+
+def green(text):
+    """Colors text green for the terminal.
+
+    Args:
+      text: Text we want to color.
+
+    Returns:
+      The text wrapped in ANSI color codes.
+    """
+    return f"\033[32m{text}\033[0m"
+
+
+def red(text):
+    """Colors text red for the terminal.
+
+    Args:
+      text: Text we want to color.
+
+    Returns:
+      The text wrapped in ANSI color codes.
+    """
+    return f"\033[31m{text}\033[0m"
 
 
 class Error(Exception):
@@ -46,8 +83,25 @@ class Error(Exception):
     """
 
 
+@dataclass
+class ArrayPort:
+    """Serial port and array information for a connected Arduino.
+
+    Attributes:
+      path: Address of the USB port.
+      serial_object: pySerial object, None until the port is opened.
+      array_number: Array number sent by the Arduino when it connects.
+      number_of_motors: Number of motors sent by the Arduino when it connects.
+    """
+
+    path: str
+    serial_object: serial.Serial = None
+    array_number: int = -1
+    number_of_motors: int = 0
+
+
 def find_arduinos():
-    """Run ls command and find all USB devices connected to USB hub
+    """Find all USB devices at USB_PATH connected to USB hub
      assume that all of them are Arduinos.
 
     Returns:
@@ -57,37 +111,64 @@ def find_arduinos():
       Error: if no arrays are found or if more than MAX_NUMBER_OF_ARRAYS is
     found.
     """
-    # run ls in subprocess shell and save results
-    try:
-        path_command = "ls " + USB_PATH
-        serial_shell_capture = subprocess.run(
-            [path_command], shell=True, capture_output=True, check=True
-        )
-        # take results and convert byte string into utf-8 and create list based on newlines
-        serial_shell_capture_list = serial_shell_capture.stdout.decode(
-            "utf-8"
-        ).splitlines()
-        # if there is at least one array found then print out number found
-        # other wise print zero and error
-        print(
-            f"Found \033[32m{len(serial_shell_capture_list)}\033[0m Array(s)",
-            f"of Max of {MAX_NUMBER_OF_ARRAYS}",
-        )
-        # make sure that the # arrays found is less than or equal to MAX_NUMBER_OF_ARRAYS
-        if len(serial_shell_capture_list) > MAX_NUMBER_OF_ARRAYS:
-            # make list empty so we don't try to close ports when this error occurs
-            serial_shell_capture_list = []
-            print(
-                f"\033[31mERROR: NUMBER OF ARRAYS FOUND GREATER THAN {MAX_NUMBER_OF_ARRAYS}\033[0m"
-            )
-            raise Error
-    except subprocess.CalledProcessError:
-        # need to still have a valie
-        serial_shell_capture_list = []
-        print(f"\nFound \033[31m0\033[0m Array(s) of Max {MAX_NUMBER_OF_ARRAYS}")
-        print(f"\033[31mERROR: NO ARRAYS FOUND\033[0m")
+    serial_ports_found = sorted(glob.glob(USB_PATH))
+    if not serial_ports_found:
+        print(f"\nFound {red('0')} Array(s) of Max {MAX_NUMBER_OF_ARRAYS}")
+        print(red("ERROR: NO ARRAYS FOUND"))
         raise Error
-    return serial_shell_capture_list
+    # if there is at least one array found then print out number found
+    print(
+        f"Found {green(len(serial_ports_found))} Array(s)",
+        f"of Max of {MAX_NUMBER_OF_ARRAYS}",
+    )
+    # make sure that the # arrays found is less than or equal to MAX_NUMBER_OF_ARRAYS
+    if len(serial_ports_found) > MAX_NUMBER_OF_ARRAYS:
+        print(red(f"ERROR: NUMBER OF ARRAYS FOUND GREATER THAN {MAX_NUMBER_OF_ARRAYS}"))
+        raise Error
+    return serial_ports_found
+
+
+def write_state_file(state_filename, state):
+    """Writes an array to a csv file overwriting the previous file. Every value is
+    quoted to match the format the csv files are edited in. The array is written to
+    a temporary file first and then renamed so a crash can't leave a half written
+    file behind.
+
+    Args:
+      state_filename: The name of the file we are writing.
+      state: Array with one row for each array and one column for each motor.
+    """
+    with tempfile.NamedTemporaryFile(
+        "wb", dir=os.path.dirname(state_filename) or ".", delete=False
+    ) as temporary_file:
+        try:
+            np.savetxt(temporary_file, state, fmt='"%d"', delimiter=",")
+            # temporary files are only readable by us, keep the original permissions
+            try:
+                state_mode = stat.S_IMODE(os.stat(state_filename).st_mode)
+                os.fchmod(temporary_file.fileno(), state_mode)
+            except FileNotFoundError:
+                pass
+        except BaseException:
+            # don't leave the half written temporary file behind
+            os.unlink(temporary_file.name)
+            raise
+    os.replace(temporary_file.name, state_filename)
+
+
+def save_current_state():
+    """Saves current states from STATE_QUEUE to CURRENT_STATE_FILENAME. Runs in a
+    background thread so writing to the sd card doesn't hold up the menu.
+    """
+    while True:
+        current_state = STATE_QUEUE.get()
+        try:
+            write_state_file(CURRENT_STATE_FILENAME, current_state)
+        except EnvironmentError:
+            error_message = red("ERROR: CAN'T WRITE CSV")
+            SPINNER.write(f"{CURRENT_STATE_FILENAME} ({error_message})")
+        finally:
+            STATE_QUEUE.task_done()
 
 
 def lint_csv_file(csv_filename):
@@ -96,64 +177,58 @@ def lint_csv_file(csv_filename):
     Args:
       csv_filename: The name of the file we are linting.
 
+    Returns:
+      Array of the linted values with one row for each array and one column for
+        each motor.
+
     Raises:
       Error: If the program can not read the file.
       Error: If the program can not write to the file.
     """
-    csv_filename_list = []
-    # we initialize this list to a particular size becuase we then iterate over it and
-    # copy values from csv_filename_list. When copying we also make sure that the
-    # values are allowed (filters out non ints and values that are too high or low)
-    csv_filename_list_linted = [
-        ["0" for x in range(MAX_NUMBER_OF_MOTORS)] for y in range(MAX_NUMBER_OF_ARRAYS)
-    ]
+    # we initialize this array to a particular size becuase we then copy values
+    # from the file in to it. Cells that are missing from the file stay empty
+    # and are zeroed along with any other invalid values
+    csv_filename_cells = np.full(
+        (MAX_NUMBER_OF_ARRAYS, MAX_NUMBER_OF_MOTORS), "", dtype=object
+    )
     try:
         with open(csv_filename, "r") as csv_filename_file:
             csv_filename_reader = csv.reader(csv_filename_file, delimiter=",")
-            csv_filename_list = list(csv_filename_reader)
-            for count_row in range(0, MAX_NUMBER_OF_ARRAYS):
-                for count_column in range(0, MAX_NUMBER_OF_MOTORS):
-                    try:
-                        # pylint: disable=C0330
-                        if (
-                            int(csv_filename_list[count_row][count_column]) <= MAX_TURNS
-                            and int(csv_filename_list[count_row][count_column]) > 0
-                            and csv_filename_list[count_row][count_column] != ""
-                            and isinstance(
-                                int(csv_filename_list[count_row][count_column]), int
-                            )
-                        ):
-                            csv_filename_list_linted[count_row][
-                                count_column
-                            ] = csv_filename_list[count_row][count_column]
-                        else:
-                            csv_filename_list_linted[count_row][count_column] = "0"
-                    except (IndexError, ValueError):
-                        csv_filename_list_linted[count_row][count_column] = "0"
+            for count_row, row in enumerate(csv_filename_reader):
+                if count_row >= MAX_NUMBER_OF_ARRAYS:
+                    break
+                row = row[:MAX_NUMBER_OF_MOTORS]
+                csv_filename_cells[count_row, : len(row)] = row
     except EnvironmentError:
-        SPINNER.write(
-            csv_filename + " (\033[31m" + "ERROR: CAN'T READ CSV" + "\033[0m)"
-        )
+        error_message = red("ERROR: CAN'T READ CSV")
+        SPINNER.write(f"{csv_filename} ({error_message})")
         raise Error
+    # filter out values that aren't ints or that are too high or low. Leading zeros
+    # are stripped before checking the length so huge numbers never get converted
+    csv_filename_cells = np.char.strip(csv_filename_cells.astype(str))
+    is_number = np.char.isdecimal(csv_filename_cells) & (
+        np.char.str_len(np.char.lstrip(csv_filename_cells, "0")) <= len(str(MAX_TURNS))
+    )
+    csv_filename_values = np.where(is_number, csv_filename_cells, "0").astype(int)
+    csv_filename_values[
+        (csv_filename_values < 1) | (csv_filename_values > MAX_TURNS)
+    ] = 0
     # write values to file overwriting previous file
     try:
-        with open(csv_filename, "w", newline="") as csv_filename_file:
-            csv_filename_writer = csv.writer(csv_filename_file, quoting=csv.QUOTE_ALL)
-            csv_filename_writer.writerows(csv_filename_list_linted)
-            SPINNER.write(csv_filename + " (\033[32m" + "COMPLETE" + "\033[0m)")
+        write_state_file(csv_filename, csv_filename_values)
+        SPINNER.write(f"{csv_filename} ({green('COMPLETE')})")
     except EnvironmentError:
-        SPINNER.write(
-            csv_filename + " (\033[31m" + "ERROR: CAN'T WRITE CSV" + "\033[0m)"
-        )
+        error_message = red("ERROR: CAN'T WRITE CSV")
+        SPINNER.write(f"{csv_filename} ({error_message})")
         raise Error
+    return csv_filename_values
 
 
 def lint_serial_port_values(serial_ports):
     """Makes sure that the numbers for array number and number of motors is valid.
 
     Args:
-      serial_ports: List containing address of USB ports, pySerial object, array number,
-        and number of motors.
+      serial_ports: List of ArrayPort objects, one for each connected array.
 
     Raises:
       Error: Duplicate array numbers
@@ -166,9 +241,9 @@ def lint_serial_port_values(serial_ports):
     seen = {}
     duplicates = []
     print("\nChecking Array and Motor Numbers")
-    for row in serial_ports:
-        list_array_numbers.append(row[2])
-        list_motor_numbers.append(row[3])
+    for array_port in serial_ports:
+        list_array_numbers.append(int(array_port.array_number))
+        list_motor_numbers.append(int(array_port.number_of_motors))
     # check if there are any duplicates
     for number in list_array_numbers:
         if number not in seen:
@@ -178,134 +253,161 @@ def lint_serial_port_values(serial_ports):
                 duplicates.append(number)
             seen[number] += 1
     for number in duplicates:
-        print(f"Array Numbers (\033[31mERROR: ARRAY {number} DUPLICATES\033[0m)")
+        print(f"Array Numbers ({red(f'ERROR: ARRAY {number} DUPLICATES')})")
         error = True
     # check and see if any of the arrays are out of the correct range
     for number in list_array_numbers:
-        # >= because array numbers from the Arduino start at 0
-        if int(number) >= MAX_NUMBER_OF_ARRAYS or int(number) < 0:
-            print(f"Array Numbers (\033[31mERROR: ARRAY {number} OUT OF RANGE\033[0m)")
+        # < because array numbers from the Arduino start at 0
+        if not 0 <= number < MAX_NUMBER_OF_ARRAYS:
+            print(f"Array Numbers ({red(f'ERROR: ARRAY {number} OUT OF RANGE')})")
             error = True
     # check and see if any of the motor numbers are out of the correct range
     for count_number, number in enumerate(list_motor_numbers):
-        # > because motor numbers start at 1 when counted aka 0 motors means no motors
+        # <= because motor numbers start at 1 when counted aka 0 motors means no motors
         # while 1 motor means #0. When sending commands motor one is considered as #0
-        if int(number) > MAX_NUMBER_OF_MOTORS or int(number) < 1:
-            print(
-                f"Motor Numbers (\033[31mERROR: ARRAY {list_array_numbers[count_number]}",
-                "NUMBER OF MOTORS {number} OUT OF RANGE\033[0m)",
+        if not 1 <= number <= MAX_NUMBER_OF_MOTORS:
+            error_message = red(
+                f"ERROR: ARRAY {list_array_numbers[count_number]}"
+                f" NUMBER OF MOTORS {number} OUT OF RANGE"
             )
+            print(f"Motor Numbers ({error_message})")
             error = True
     if error:
         raise Error
-    print("Array Numbers (\033[32mCOMPLETE\033[0m)")
-    print("Motor Numbers (\033[32mCOMPLETE\033[0m)")
+    print(f"Array Numbers ({green('COMPLETE')})")
+    print(f"Motor Numbers ({green('COMPLETE')})")
 
 
-def commands_from_csv(serial_ports, desired_state_filename):
-    """Reads data from desiered_state.csv, lints it, and then executes the commands.
+def commands_from_csv(serial_ports, desired_state, current_state):
+    """Executes the commands needed to move the ceiling from the current state to the
+    desired state.
 
     Args:
-      serial_ports: List containing address of USB ports, pySerial object, array number,
-        and number of motors.
+      serial_ports: List of ArrayPort objects, one for each connected array.
+      desired_state: Linted array from the csv file we want the ceiling to match.
+      current_state: Array of the current position of every motor.
+
+    Returns:
+      The new current state, which is queued to be saved to CURRENT_STATE_FILENAME.
     """
-    # fill command string
-    command_string = ""
-    desired_state_list = []
-    current_state_list = []
-    # not putting try except blocks around with statements because they have
-    # already been read and written to before and are accessable
-    with open(desired_state_filename, "r") as desired_state_file:
-        desired_state_reader = csv.reader(desired_state_file, delimiter=",")
-        desired_state_list = list(desired_state_reader)
-    with open(CURRENT_STATE_FILENAME, "r", newline="") as current_state_file:
-        current_state_reader = csv.reader(current_state_file, delimiter=",")
-        current_state_list = list(current_state_reader)
-    for count_row, _ in enumerate(serial_ports):
-        # beginning of every command for an array
-        command_string += "<"
-        # get desired state row correspnding to the array number
-        desired_row = desired_state_list[serial_ports[count_row][2]]
-        # get current state row correspnding to the array number
-        current_row = current_state_list[serial_ports[count_row][2]]
-        for count_column, _ in enumerate(desired_row):
-            # < because motor number isn't counting from zero
-            if count_column < serial_ports[count_row][3]:
-                difference = int(current_row[count_column]) - int(
-                    desired_row[count_column]
-                )
-                if difference < 0:
-                    command_string += "Down,"
-                elif difference > 0:
-                    command_string += "Up,"
-                else:
-                    command_string += "None,"
-                # make sure that the number of turns is positive
-                command_string += str(abs(difference)) + ","
-        # remove extra comma
-        command_string = command_string[:-1]
-        command_string += ">;"
-    # remove final semicolon
-    command_string = command_string[:-1]
+    # one command for each array
+    array_commands = []
+    # get the rows corresponding to each array number
+    array_numbers = np.fromiter(
+        (array_port.array_number for array_port in serial_ports), dtype=np.int8
+    )
+    differences = current_state[array_numbers] - desired_state[array_numbers]
+    for array_port, difference in zip(serial_ports, differences):
+        # only keep the columns for motors that are connected
+        difference = difference[: array_port.number_of_motors]
+        directions = np.where(
+            difference < 0, b"Down", np.where(difference > 0, b"Up", b"None")
+        )
+        # make sure that the number of turns is positive
+        turns = np.abs(difference)
+        array_commands.append(
+            b"<"
+            + b",".join(
+                b"%s,%d" % (direction, turn)
+                for direction, turn in zip(directions, turns)
+            )
+            + b">"
+        )
+    command_string = b";".join(array_commands)
     # call execute commands
-    print(command_string)
+    print(command_string.decode("ascii"))
     execute_commands(serial_ports, command_string)
-    shutil.copy2(desired_state_filename, CURRENT_STATE_FILENAME)
+    STATE_QUEUE.put(desired_state.copy())
+    return desired_state
 
 
 def commands_from_variable(serial_ports, variable_string):
     """Sends the same command to every motor in the ceiling. Used for reset and testing.
 
     Args:
-      serial_ports: List containing address of USB ports, pySerial object, array number,
-        and number of motors.
+      serial_ports: List of ArrayPort objects, one for each connected array.
       variable_string: Command that we want every motor to execute. Example: "Up,100,".
+
+    Returns:
+      The new current state, which is queued to be saved to CURRENT_STATE_FILENAME.
     """
-    command_string = ""
-    # first we zero the current state file
-    current_state_list_zero = [
-        ["0" for x in range(MAX_NUMBER_OF_ARRAYS)] for y in range(MAX_NUMBER_OF_MOTORS)
-    ]
-    with open(CURRENT_STATE_FILENAME, "w", newline="") as current_state_file:
-        current_state_writer = csv.writer(current_state_file, quoting=csv.QUOTE_ALL)
-        current_state_writer.writerows(current_state_list_zero)
-
-    for count_row, _ in enumerate(serial_ports):
-        # beginning of every command for an array
-        command_string += "<"
-        for _ in range(serial_ports[count_row][3]):
-            command_string += variable_string
-        # remove extra comma
-        command_string = command_string[:-1]
-        command_string += ">;"
-    # remove final semicolon
-    command_string = command_string[:-1]
+    # first we zero the current state
+    current_state = np.zeros(
+        (MAX_NUMBER_OF_ARRAYS, MAX_NUMBER_OF_MOTORS), dtype=np.int8
+    )
+    STATE_QUEUE.put(current_state.copy())
+    command_string = b";".join(
+        array_command_from_variable(variable_string, array_port.number_of_motors)
+        for array_port in serial_ports
+    )
     # call execute commands
     execute_commands(serial_ports, command_string)
+    return current_state
+
+
+@functools.lru_cache(maxsize=32)
+def array_command_from_variable(variable_string, number_of_motors):
+    """Builds the command for a single array that sends the same command to every
+    motor. Cached since reset and test mode send the same commands over and over,
+    the cache is kept small because single commands are typed in by the user.
+
+    Args:
+      variable_string: Command that we want every motor to execute. Example: "Up,100,".
+      number_of_motors: Number of motors connected to the array.
+
+    Returns:
+      Command for the array encoded ready to send. Example: b"<Up,100,Up,100>".
+    """
+    # the command for a single motor without the trailing comma
+    motor_command = variable_string.rstrip(",")
+    return ("<" + ",".join([motor_command] * number_of_motors) + ">").encode()
 
 
 def execute_commands(serial_ports, command_string_execute):
-    """Creates threads that send commands to the Arduinos and wait for replies.
-    there is one thread for each Arduino.
+    """Sends commands to the Arduinos and waits for replies. All the commands are
+    sent first and then a selector waits on every serial port at once so only one
+    thread is needed.
 
     Args:
-      serial_ports: List containing address of USB ports, pySerial object, array number,
-        and number of motors.
-      command_string_execute: String of commands that are to be sent to all the arrays.
+      serial_ports: List of ArrayPort objects, one for each connected array.
+      command_string_execute: Encoded commands that are to be sent to all the arrays,
+        separated by semicolons.
     """
-    parse_text = command_string_execute.split(";")
-    threads = [None] * len(serial_ports)
+    parse_text = command_string_execute.split(b";")
+    # bytes recieved so far from each array
+    recieved = [b""] * len(parse_text)
+    selector = selectors.DefaultSelector()
     SPINNER.start()
-    # create threads
-    for count, _ in enumerate(parse_text):
-        threads[count] = Thread(
-            target=move_arrays, args=(serial_ports, parse_text[count], count)
-        )
-        # start threads
-        threads[count].start()
-    # wait for threads to finish
-    for count, _ in enumerate(parse_text):
-        threads[count].join()
+    for count, array_command in enumerate(parse_text):
+        serial_object = serial_ports[count].serial_object
+        try:
+            serial_object.write(array_command)
+            selector.register(serial_object.fileno(), selectors.EVENT_READ, count)
+        except (OSError, ValueError):
+            # don't wait on this array but still send to the others
+            SPINNER.write(f"== == Array: {count} ({red('EXECUTION ERROR')})")
+            continue
+        SPINNER.write(f"-> -> Array: {count} ({green('SENT')})")
+    deadline = time.monotonic() + ARDUINO_EXECUTE_TIMEOUT
+    # wait until every array has replied or we run out of time
+    while selector.get_map() and time.monotonic() < deadline:
+        for key, _ in selector.select(timeout=deadline - time.monotonic()):
+            serial_object = serial_ports[key.data].serial_object
+            try:
+                recieved[key.data] += serial_object.read(serial_object.in_waiting or 1)
+                data_recieved = parse_arduino_message(recieved[key.data])
+            except (OSError, UnicodeDecodeError):
+                # stop waiting on this array but keep going with the others
+                SPINNER.write(f"== == Array: {key.data} ({red('EXECUTION ERROR')})")
+                selector.unregister(key.fd)
+                continue
+            if data_recieved is not None:
+                SPINNER.write(f"<- <- Array: {key.data} ({data_recieved})")
+                selector.unregister(key.fd)
+    # any array that is still registered didn't reply in time
+    for key in selector.get_map().values():
+        SPINNER.write(f"== == Array: {key.data} ({red('EXECUTION ERROR TIMEOUT')})")
+    selector.close()
     SPINNER.stop()
 
 
@@ -313,44 +415,38 @@ def open_ports(serial_ports):
     """Open ports and create pySerial objects saving them to serial_ports.
 
     Args:
-      serial_ports: List containing address of USB ports, pySerial object, array number,
-        and number of motors.
+      serial_ports: List containing address of USB ports.
 
     Returns:
-      Returns a list with serial_ports data but with the pySerial object added for each array.
+      Returns a list of ArrayPort objects with the pySerial object added for each array.
 
     Raises:
       Error: If pySerial object cannot be created.
     """
     print("\nOpening Port(s)")
     SPINNER.start()
+    # wrap every address first, in place, so ports that were opened can still be
+    # closed if a later one fails
+    serial_ports[:] = [ArrayPort(path) for path in serial_ports]
     # go through serial_ports list and try to connect to usb devices
     # otherwise error
-    for count, _ in enumerate(serial_ports):
+    for count, array_port in enumerate(serial_ports):
         try:
-            serial_ports[count] = [
-                serial_ports[count],
-                serial.Serial(serial_ports[count], BAUD_RATE),
-            ]
-            SPINNER.write(
-                "Serial Port "
-                + str(count)
-                + " "
-                + serial_ports[count][0]
-                + " (\033[32m"
-                + "COMPLETE"
-                + "\033[0m)"
+            serial_object = serial.Serial(
+                array_port.path, BAUD_RATE, timeout=ARDUINO_MESSAGE_TIMEOUT
             )
-        except serial.serialutil.SerialException:
+            # ask the driver to pass short replies up straight away instead of
+            # holding them in the usb buffer, not every adapter supports this
+            try:
+                serial_object.set_low_latency_mode(True)
+            except (OSError, ValueError, NotImplementedError):
+                pass
+            array_port.serial_object = serial_object
             SPINNER.write(
-                "Serial Port "
-                + str(count)
-                + " "
-                + serial_ports[count][0]
-                + " (\033[31m"
-                + "ERROR"
-                + "\033[0m)"
+                f"Serial Port {count} {array_port.path} ({green('COMPLETE')})"
             )
+        except serial.serialutil.SerialException:
+            SPINNER.write(f"Serial Port {count} {array_port.path} ({red('ERROR')})")
             SPINNER.stop()
             raise Error
     SPINNER.stop()
@@ -361,8 +457,7 @@ def connect_to_arrays(serial_ports):
     """Connect to arrays and retrieve connection message.
 
     Args:
-      serial_ports: List containing address of USB ports, pySerial object, array number,
-        and number of motors.
+      serial_ports: List of ArrayPort objects, one for each connected array.
 
     Returns:
       Returns a list with serial_ports data but with array number and number of motors
@@ -372,213 +467,155 @@ def connect_to_arrays(serial_ports):
       Error: If the correct message is not recived within timeout.
     """
     print("\nConnecting to Array(s)")
-    # used for thread objects
-    connection_threads = [None] * len(serial_ports)
-    # used to store returned values from threads
-    results = [None] * len(serial_ports)
     SPINNER.start()
-    # create threads
-    for count, _ in enumerate(serial_ports):
-        connection_threads[count] = Thread(
-            target=wait_for_arduino_connection, args=(serial_ports, count, results)
-        )
-        # start threads
-        connection_threads[count].start()
+    futures = [
+        EXECUTOR.submit(wait_for_arduino_connection, serial_ports, count)
+        for count, _ in enumerate(serial_ports)
+    ]
     # wait for threads to finish
-    for count, _ in enumerate(serial_ports):
-        connection_threads[count].join()
+    wait(futures)
     SPINNER.stop()
-    # get returned values from threads and assign to serial_port
-    for count_row, row in enumerate(results):
-        if row[0]:
-            raise Error
-        serial_ports[count_row] = row[1]
+    # get returned values from threads and assign to serial_port, result() raises
+    # the Error from any thread that failed
+    for count, future in enumerate(futures):
+        serial_ports[count] = future.result()
     return serial_ports
 
 
-def wait_for_arduino_connection(serial_ports, port, results):
+def wait_for_arduino_connection(serial_ports, port):
     """Wait until the Arduino sends "Arduino is Ready" - allows time for Arduino
     reset it also ensures that any bytes left over from a previous message are
     discarded.
 
     Args:
-      serial_ports: List containing address of USB ports, pySerial object, array number,
-        and number of motors.
+      serial_ports: List of ArrayPort objects, one for each connected array.
       port: Thread number created from enumerating through serial_ports.
-      results: Used to find if errors occoured in the thread and pass back to connect_to_arrays().
+
+    Returns:
+      A copy of the ArrayPort for this port with array number and number of motors
+        filled in.
+
+    Raises:
+      Error: If the correct message is not recived within timeout.
     """
-    error = False
     try:
         array_info = wait_for_arduino_connection_execute(serial_ports, port)
-        serial_ports[port] = [
-            serial_ports[port][0],
-            serial_ports[port][1],
-            array_info[0],
-            array_info[1],
-        ]
-        SPINNER.write(
-            "Serial Port "
-            + str(port)
-            + " ARRAY "
-            + str(array_info[0])
-            + " MOTOR(S) "
-            + str(array_info[1])
-            + " (\033[32mCOMPLETE\033[0m)"
+        array_port = replace(
+            serial_ports[port],
+            array_number=array_info[0],
+            number_of_motors=array_info[1],
         )
-    except timeout_decorator.TimeoutError:
-        error = True
         SPINNER.write(
-            "Serial Port "
-            + str(port)
-            + " (\033[31m"
-            + "ERROR: WAITING FOR MESSAGE TIMEOUT"
-            + "\033[0m)"
+            f"Serial Port {port} ARRAY {array_info[0]} MOTOR(S) {array_info[1]}"
+            f" ({green('COMPLETE')})"
         )
-    except IndexError:
-        error = True
-        SPINNER.write(
-            "Serial Port "
-            + str(port)
-            + " (\033[31m"
-            + "ERROR: NEGATIVE ARRAY NUMBER OR MOTOR NUMBER PASSED"
-            + "\033[0m)"
-        )
-    # works as a return functon for the thread
-    results[port] = [error, serial_ports[port]]
+    except TimeoutError:
+        error_message = red("ERROR: WAITING FOR MESSAGE TIMEOUT")
+        SPINNER.write(f"Serial Port {port} ({error_message})")
+        raise Error
+    except UnicodeDecodeError:
+        # subclass of ValueError so it has to be caught first
+        error_message = red("ERROR: READY MESSAGE NOT ASCII")
+        SPINNER.write(f"Serial Port {port} ({error_message})")
+        raise Error
+    except ValueError:
+        error_message = red("ERROR: READY MESSAGE MISSING ARRAY OR MOTOR NUMBER")
+        SPINNER.write(f"Serial Port {port} ({error_message})")
+        raise Error
+    return array_port
 
 
-@timeout_decorator.timeout(ARDUINO_MESSAGE_TIMEOUT, use_signals=False)
 def wait_for_arduino_connection_execute(serial_ports, port):
     """Waits for Arduino to send ready message. Created so we can have a
     timeout and a try catch block.
 
     Args:
-      serial_ports: List containing address of USB ports, pySerial object, array number,
-        and number of motors.
+      serial_ports: List of ArrayPort objects, one for each connected array.
       port: Thread number created from enumerating through serial_ports.
 
     Returns:
       Array number and the number of motors conntected to it.
+
+    Raises:
+      TimeoutError: If the ready message isn't recieved within ARDUINO_MESSAGE_TIMEOUT.
+      UnicodeDecodeError: If the message recieved isn't ascii.
+      ValueError: If the ready message doesn't contain exactly two numbers.
     """
     msg = ""
+    deadline = time.monotonic() + ARDUINO_MESSAGE_TIMEOUT
     while msg.find("Arduino is Ready") == -1:
-        while serial_ports[port][1].inWaiting() == 0:
-            pass
-        msg = recieve_from_arduino(serial_ports, port)
+        msg = recieve_from_arduino(serial_ports[port].serial_object, deadline)
     # gets the array number and the number of motors in the array
-    array_info = [int(i) for i in msg.split() if i.isdigit()]
+    array_info = [int(number) for number in READY_MESSAGE_NUMBERS.findall(msg)]
+    if len(array_info) != 2:
+        raise ValueError
     return array_info
 
 
-def recieve_from_arduino(serial_ports, port):
+def recieve_from_arduino(serial_object, deadline):
     """Gets message from Arduino.
 
     Args:
-      serial_ports: List containing address of USB ports, pySerial object, array number,
-        and number of motors.
-      port: Thread number created from enumerating through serial_ports.
+      serial_object: pySerial object of the Arduino we are recieving from.
+      deadline: time.monotonic() value by which the message has to be recieved.
 
     Returns:
       The string that was returned from the Arduino.
-    """
-    recieve_string = ""
-    # any value that is not an end- or START_MARKER
-    recieve_char = "z"
-    recieve_char = serial_ports[port][1].read()
-    recieve_char = recieve_char.decode("utf-8")
-    # wait for the start character
-    while ord(recieve_char) != START_MARKER:
-        recieve_char = serial_ports[port][1].read()
-        recieve_char = recieve_char.decode("utf-8")
-    # save data until the end marker is found
-    while True:
-        recieve_char = serial_ports[port][1].read()
-        recieve_char = recieve_char.decode("utf-8")
-        if ord(recieve_char) == END_MARKER:
-            break
-        recieve_string = recieve_string + recieve_char
-    return recieve_string
 
-
-def move_arrays(serial_ports, parce_string, port):
-    """Wait until the Arduino sends "Arduino Ready" - allows time for Arduino
-    reset it also ensures that any bytes left over from a previous message are
-    discarded.
-
-    Args:
-      serial_ports: List containing address of USB ports, pySerial object, array number,
-        and number of motors.
-      parce_string: String of commands sent to an array
-      port: Thread number created from enumerating through serial_ports.
+    Raises:
+      TimeoutError: If a complete message isn't recieved before the deadline.
     """
-    try:
-        move_arrays_execute(serial_ports, parce_string, port)
-    except timeout_decorator.TimeoutError:
-        SPINNER.write(
-            "== == Array: "
-            + str(port)
-            + " (\033[31m"
-            + "EXECUTION ERROR TIMEOUT"
-            + "\033[0m)"
-        )
-
-
-@timeout_decorator.timeout(ARDUINO_EXECUTE_TIMEOUT, use_signals=False)
-def move_arrays_execute(serial_ports, parce_string, port):
-    """Sends commands Arduino and then waits for a reply. Created off move_arrays() so
-    we can have both a timeout and a try catch block.
+    recieve_bytes = b""
+    message = None
+    # keep reading until we have a complete message between the start and end
+    # markers, the serial timeout makes each read block until the deadline
+    while message is None:
+        time_left = deadline - time.monotonic()
+        if time_left <= 0:
+            raise TimeoutError
+        serial_object.timeout = time_left
+        recieve_bytes += serial_object.read_until(bytes([END_MARKER]))
+        message = parse_arduino_message(recieve_bytes)
+    return message
+
+
+def parse_arduino_message(recieve_bytes):
+    """Gets the first complete message from bytes recieved from an Arduino.
+    Anything left over from before the start marker is discarded.
 
     Args:
-      serial_ports: List containing address of USB ports, pySerial object, array number,
-        and number of motors.
-      parce_string: String of commands sent to an array
-      port: Thread number created from enumerating through serial_ports.
+      recieve_bytes: Bytes recieved from the Arduino so far.
+
+    Returns:
+      The string between the start and end markers or None if a complete message
+        hasn't been recieved yet.
     """
-    waiting_for_reply = False
-    if not waiting_for_reply:
-        serial_ports[port][1].write(parce_string.encode())
-        SPINNER.write("-> -> Array: " + str(port) + " (\033[32m" + "SENT" + "\033[0m)")
-        waiting_for_reply = True
-
-    if waiting_for_reply:
-        while serial_ports[port][1].inWaiting() == 0:
-            pass
-        data_recieved = recieve_from_arduino(serial_ports, port)
-        SPINNER.write("<- <- Array: " + str(port) + " (" + data_recieved + ")")
-        waiting_for_reply = False
+    end = recieve_bytes.find(END_MARKER)
+    while end != -1:
+        start = recieve_bytes.rfind(START_MARKER, 0, end)
+        if start != -1:
+            return recieve_bytes[start + 1 : end].decode("ascii")
+        end = recieve_bytes.find(END_MARKER, end + 1)
+    return None
 
 
 def close_connections(serial_ports):
     """Closes serial port(s)
 
     Args:
-      serial_ports: List containing address of USB ports, pySerial object, array number,
-        and number of motors.
+      serial_ports: List of ArrayPort objects, one for each connected array.
     """
     print("\nClosing Port(s)")
     SPINNER.start()
-    for count, _ in enumerate(serial_ports):
+    for count, array_port in enumerate(serial_ports):
         try:
-            serial_ports[count][1] = serial_ports[count][1].close
-            SPINNER.write(
-                "Serial port "
-                + str(count)
-                + " "
-                + serial_ports[count][0]
-                + " (\033[32m"
-                + "CLOSED"
-                + "\033[0m)"
-            )
-        except AttributeError:
-            SPINNER.write(
-                "Serial port "
-                + str(count)
-                + " "
-                + serial_ports[count][0]
-                + " (\033[31m"
-                + "ERROR"
-                + "\033[0m)"
-            )
+            # drop anything still buffered so close doesn't wait on it
+            array_port.serial_object.reset_input_buffer()
+            array_port.serial_object.reset_output_buffer()
+            array_port.serial_object.close()
+            SPINNER.write(f"Serial port {count} {array_port.path} ({green('CLOSED')})")
+        except (AttributeError, serial.serialutil.SerialException):
+            SPINNER.write(f"Serial port {count} {array_port.path} ({red('ERROR')})")
             SPINNER.stop()
     SPINNER.stop()
 
@@ -601,8 +638,7 @@ def setup_system(serial_ports):
     """Provides UI to connect to Arduinos and set up serial objects
 
     Args:
-      serial_ports: List containing address of USB ports, pySerial object, array number,
-        and number of motors.
+      serial_ports: List of ArrayPort objects, one for each connected array.
     """
     while True:
         try:
@@ -656,9 +692,11 @@ def run_system(serial_ports):
     """Provides UI to send commands to the ceiling sculpture
 
     Args:
-      serial_ports: List containing address of USB ports, pySerial object, array number,
-        and number of motors.
+      serial_ports: List of ArrayPort objects, one for each connected array.
     """
+    # kept in memory once it has been read so we don't read it before every command,
+    # changes are saved in the background by save_current_state()
+    current_state = None
     while True:
         try:
             print("\033[96m===========\033[0m\n")
@@ -672,50 +710,51 @@ def run_system(serial_ports):
                 ).ask()
                 if input_text_3 != "Back":
                     print("\nLinting csv files")
-                    lint_csv_file(input_text_3)
-                    lint_csv_file(CURRENT_STATE_FILENAME)
+                    desired_state = lint_csv_file(input_text_3)
+                    if current_state is None:
+                        current_state = lint_csv_file(CURRENT_STATE_FILENAME)
                     print("\nExecuting Commands")
-                    commands_from_csv(serial_ports, input_text_3)
+                    current_state = commands_from_csv(
+                        serial_ports, desired_state, current_state
+                    )
             elif input_text_2 == "Reset":
-                print("\nLinting csv files")
-                lint_csv_file(CURRENT_STATE_FILENAME)
                 print("\nExecuting Commands")
-                commands_from_variable(serial_ports, "Up,100,")
+                current_state = commands_from_variable(serial_ports, "Up,100,")
             elif input_text_2 == "Single command":
                 input_text_3 = questionary.text(
                     'Enter a command in format "Up,10," ("Back" to exit)'
                 ).ask()
                 if input_text_3 != "Back":
-                    commands_from_variable(serial_ports, input_text_3)
+                    current_state = commands_from_variable(serial_ports, input_text_3)
             elif input_text_2 == "Test":
                 print("\nTest Mode (Only way to stop is to 'ctrl + c' many times)\n")
                 while True:
                     print("Resetting\n")
-                    commands_from_variable(serial_ports, "Up,100,")
+                    current_state = commands_from_variable(serial_ports, "Up,100,")
                     print("Waiting 5 seconds\n")
                     time.sleep(5)
                     print("Moving Down 5 Turns\n")
-                    commands_from_variable(serial_ports, "Down,5,")
+                    current_state = commands_from_variable(serial_ports, "Down,5,")
                     print("Wait 5 seconds\n")
                     time.sleep(5)
                     print("Moving Up 1 Turn\n")
-                    commands_from_variable(serial_ports, "Up,1,")
+                    current_state = commands_from_variable(serial_ports, "Up,1,")
                     print("Wait 5 seconds\n")
                     time.sleep(5)
                     print("Moving Up 1 Turn\n")
-                    commands_from_variable(serial_ports, "Up,1,")
+                    current_state = commands_from_variable(serial_ports, "Up,1,")
                     print("Wait 5 seconds\n")
                     time.sleep(5)
                     print("Moving Down 1 Turn\n")
-                    commands_from_variable(serial_ports, "Down,1,")
+                    current_state = commands_from_variable(serial_ports, "Down,1,")
                     print("Wait 5 seconds\n")
                     time.sleep(5)
                     print("Moving Down 1 Turn\n")
-                    commands_from_variable(serial_ports, "Down,1,")
+                    current_state = commands_from_variable(serial_ports, "Down,1,")
                     print("Wait 5 seconds\n")
                     time.sleep(5)
                     print("Moving Up 1 Turn\n")
-                    commands_from_variable(serial_ports, "Up,1,")
+                    current_state = commands_from_variable(serial_ports, "Up,1,")
                     print("Wait 5 seconds\n")
                     time.sleep(5)
             elif input_text_2 == "Exit":
@@ -728,11 +767,15 @@ def run_system(serial_ports):
 def main():
     """Loop of the program. Provides tui to interact with the ceiling sculpture
     """
-    # address of USB port,pySerial object, array number, and number of motors
+    # ArrayPort objects with the address of USB port, pySerial object, array number,
+    # and number of motors
     serial_ports = []
+    Thread(target=save_current_state, daemon=True).start()
     serial_ports, input_text = setup_system(serial_ports)
     if input_text != "Exit":
         run_system(serial_ports)
+    # make sure the last current state has been saved before exiting
+    STATE_QUEUE.join()
 
 
 if __name__ == "__main__":